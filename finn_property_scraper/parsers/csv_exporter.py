@@ -1,7 +1,13 @@
 from __future__ import annotations
 
-from typing import Iterable, List, Dict, Any
-import pandas as pd
+import csv
+import operator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Dict, Any
+
+if TYPE_CHECKING:
+    # pandas is only needed for properties_to_dataframe; imported lazily there
+    import pandas as pd
 
 # ---- Selectors --------------------------------------------------------------
 
@@ -38,6 +44,10 @@ _ADDRESS_COLS = ["address", "neighbourhood"]
 # Order of columns in the exported CSV
 _EXPORT_COL_ORDER = _ADDRESS_COLS + _CATEGORICAL_COLS + _NUMERIC_COLS
 
+# Fields read straight off Property, fetched in one C-level call per row
+_PROPERTY_COLS = _CATEGORICAL_COLS + _NUMERIC_COLS
+_get_property_cols = operator.attrgetter(*_PROPERTY_COLS)
+
 
 # ---- Core flattening --------------------------------------------------------
 
@@ -55,23 +65,21 @@ def _flatten_property(p: "Property") -> Dict[str, Any]:
         "address": addr_line,
         "neighbourhood": neighbourhood,
     }
-
-    # Categorical
-    for k in _CATEGORICAL_COLS:
-        row[k] = getattr(p, k, None)
-
-    # Numeric
-    for k in _NUMERIC_COLS:
-        row[k] = getattr(p, k, None)
+    row.update(zip(_PROPERTY_COLS, _get_property_cols(p)))
 
     return row
 
 
-def properties_to_dataframe(properties: Iterable["Property"]) -> pd.DataFrame:
+def properties_to_dataframe(properties: Iterable["Property"], categorical: bool = True) -> pd.DataFrame:
     """
     Convert a list/iterable of Property objects into a pandas DataFrame
     containing only analysis-friendly columns.
+
+    With `categorical=True` string columns are cast to dtype 'category' for
+    analysis ergonomics; pass False to keep them as plain object columns.
     """
+    import pandas as pd
+
     rows = [_flatten_property(p) for p in properties]
     df = pd.DataFrame(rows)
 
@@ -81,39 +89,67 @@ def properties_to_dataframe(properties: Iterable["Property"]) -> pd.DataFrame:
             df[col] = pd.Series(dtype="float64" if col in _NUMERIC_COLS else "object")
     df = df[_EXPORT_COL_ORDER]
 
-    # Coerce numerics; keep categoricals as dtype 'category' for analysis ergonomics
+    # Numerics come out of Property already typed (int/float/None), so pandas infers
+    # int64/float64 itself; only all-None columns need casting, or they stay object
     if not df.empty:
-        for col in _NUMERIC_COLS:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+        all_null = [col for col in _NUMERIC_COLS if df[col].isna().all()]
+        if all_null:
+            df[all_null] = df[all_null].astype("float64")
+
+    if categorical and not df.empty:
         for col in _CATEGORICAL_COLS + _ADDRESS_COLS:
             df[col] = df[col].astype("category")
 
     return df
 
 
+@contextmanager
+def property_csv_writer(path: str) -> Iterator[Callable[["Property"], None]]:
+    """
+    Open `path` for streaming CSV export and yield a function that appends
+    one Property as a row. Rows go through a 1 MiB buffer, so there is no
+    per-row flush.
+    """
+    with open(path, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        writer = csv.DictWriter(f, fieldnames=_EXPORT_COL_ORDER, extrasaction="ignore")
+        writer.writeheader()
+
+        def write(p: "Property") -> None:
+            writer.writerow(_flatten_property(p))
+
+        yield write
+
+
 def properties_to_csv(properties: Iterable["Property"], path: str) -> str:
     """
-    Write the flattened data to CSV at `path`. Returns the written path.
+    Write the flattened data to CSV at `path`, one row at a time with the
+    stdlib csv writer (no pandas). Returns the written path.
     """
-    df = properties_to_dataframe(properties)
-    df.to_csv(path, index=False)
+    with property_csv_writer(path) as write:
+        for p in properties:
+            write(p)
     return path
 
 
-# ---- Optional: pure-stdlib writer (no pandas) -------------------------------
-# If you want to avoid pandas, uncomment below.
-#
-# import csv
-# def properties_to_csv_stdlib(properties: Iterable["Property"], path: str) -> str:
-#     with open(path, "w", newline="", encoding="utf-8") as f:
-#         writer = csv.DictWriter(f, fieldnames=_EXPORT_COL_ORDER)
-#         writer.writeheader()
-#         for p in properties:
-#             writer.writerow(_flatten_property(p))
-#     return path
+def csv_to_parquet(csv_path: str, path: str) -> str:
+    """
+    Convert a CSV written by property_csv_writer/properties_to_csv into a
+    zstd-compressed Parquet file at `path` (requires pyarrow), without
+    holding the Property objects in memory. Returns the written path.
+    """
+    import pandas as pd
+
+    # explicit dtypes so the Parquet schema doesn't depend on which cells happen to be blank
+    dtype: Dict[str, str] = {col: "object" for col in _ADDRESS_COLS}
+    dtype.update({col: "category" for col in _CATEGORICAL_COLS})
+    dtype.update({col: "float64" for col in _NUMERIC_COLS})
+    df = pd.read_csv(csv_path, dtype=dtype)
+    df.to_parquet(path, engine="pyarrow", compression="zstd", index=False)
+    return path
 
 
 # ---- Example usage ----------------------------------------------------------
 # props: List[Property] = [...]
 # df = properties_to_dataframe(props)          # do analysis in Python
 # properties_to_csv(props, "properties.csv")   # export for external analysis
+# csv_to_parquet("properties.csv", "properties.parquet")  # typed, compressed export
@@ -1,17 +1,20 @@
-import asyncio
+import json
 import re
+import sys
 import typing
 from typing import Optional
 
-import zendriver
-from zendriver.core.browser import Browser
+import aiohttp
 from zendriver.core.tab import Tab
 
-from finn_property_scraper.schemas.property import Property, Address
+from finn_property_scraper.schemas.property import Property, Address, GeocodeCache
 from finn_property_scraper.schemas.realestate_metadata import RealestateMetadata
 
 _NUM = re.compile(r"[^\d]")
-_FLOAT = re.compile(r"[^\d,.\-]")
+# first number in e.g. "1 234,5 m²"; digit groups may be split by (non-breaking) spaces
+_M2_RE = re.compile(r"(\d+(?:\s\d{3})*(?:[.,]\d+)?)")
+_INT_RE = re.compile(r"(\d+)")
+_POSTAL_RE = re.compile(r"(\d{4})\s+(.+)")
 
 def _clean(s: Optional[str]) -> Optional[str]:
     if not s:
@@ -19,6 +22,10 @@ def _clean(s: Optional[str]) -> Optional[str]:
     s = s.strip()
     return s or None
 
+def _intern(s: Optional[str]) -> Optional[str]:
+    # categorical values come from a tiny vocabulary; share one object per distinct value
+    return sys.intern(s) if s else s
+
 def _to_int(s: Optional[str]) -> Optional[int]:
     if not s:
         return None
@@ -33,140 +40,151 @@ def _to_int(s: Optional[str]) -> Optional[int]:
 def _to_float_m2(s: Optional[str]) -> Optional[float]:
     if not s:
         return None
-    cleaned = _FLOAT.sub("", s).replace(",", ".")
-    m = re.search(r"(\d+(?:\.\d+)?)", cleaned)
+    m = _M2_RE.search(s)
     if not m:
         return None
     try:
-        return float(m.group(1))
+        return float("".join(m.group(1).split()).replace(",", "."))
     except ValueError:
         return None
 
 def _to_int_safe(s: Optional[str]) -> Optional[int]:
     if not s:
         return None
-    m = re.search(r"(\d+)", s)
+    m = _INT_RE.search(s)
     return int(m.group(1)) if m else None
 
-async def _text(tab: Tab, selector: str) -> Optional[str]:
-    try:
-        el = await tab.select(selector, timeout=0.1)
-    except asyncio.TimeoutError:
-        return None
-    if not el:
-        return None
-    try:
-        return _clean(el.text)
-    except Exception:
-        try:
-            t = await el.text_content()
-            return _clean(t)
-        except Exception:
-            return None
-
-async def _all_texts(tab: Tab, selector: str) -> list[str]:
-    try:
-        els = await tab.select_all(selector, timeout=0.1)
-    except asyncio.TimeoutError:
-        return []
-    except zendriver.core.connection.ProtocolException:
-        return []
-    out: list[str] = []
-    for el in els or []:
-        t = None
-        try:
-            t = el.text
-        except Exception:
-            try:
-                t = await el.text_content()
-            except Exception:
-                t = None
-        t = _clean(t)
-        if t:
-            out.append(t)
-    return out
-
 def _split_address(addr: Optional[str]) -> tuple[Optional[str], Optional[str], Optional[str]]:
     if not addr:
         return None, None, None
     parts = [p.strip() for p in addr.split(",")]
     if len(parts) == 1:
         # try inline postal+city
-        m = re.search(r"(\d{4})\s+(.+)", parts[0])
+        m = _POSTAL_RE.search(parts[0])
         if m:
             return None, m.group(1), m.group(2).strip()
         return parts[0], None, None
-    m = re.search(r"(\d{4})\s+(.+)", parts[1])
+    m = _POSTAL_RE.search(parts[1])
     postal, city = (m.group(1), m.group(2).strip()) if m else (None, None)
     return parts[0], postal, city
 
-async def _status(tab: Tab) -> Optional[str]:
-    # badge area lives inside object-details; if it contains "Solgt" -> sold
-    texts = await _all_texts(tab, '[data-testid="object-details"] *')
-    for t in texts:
-        if t and t.strip().lower() == "solgt":
-            return "sold"
-    return "active"
+
+# -------------------- page extraction --------------------
+# Text fields read from the property page, keyed by the name used in parse_property_page.
+_TEXT_SELECTORS: dict[str, str] = {
+    "title": '[data-testid="object-title"] h1',
+    "subtitle": '[data-testid="object-title"] [data-testid="local-area-name"]',
+    "address_line": '[data-testid="map-link"] [data-testid="object-address"]',
+    "description_raw": '[data-testid="om boligen"] .description-area',
+    "asking_price": '[data-testid="pricing-incicative-price"] .text-28, [data-testid="pricing-incicative-price"] .font-bold',
+    "total_price": '[data-testid="pricing-total-price"] dd',
+    "transaction_costs": '[data-testid="pricing-registration-charge"] dd',
+    "shared_debt": '[data-testid="pricing-joint-debt"] dd',
+    "communal_fees": '[data-testid="pricing-common-monthly-cost"] dd',
+    "shared_equity": '[data-testid="pricing-collective-assets"] dd',
+    "assessed_wealth_value": '[data-testid="pricing-tax-value"] dd',
+    "property_type": '[data-testid="info-property-type"] dd',
+    "ownership_type": '[data-testid="info-ownership-type"] dd',
+    "bedrooms": '[data-testid="info-bedrooms"] dd',
+    "rooms": '[data-testid="info-rooms"] dd',
+    "floor": '[data-testid="info-floor"] dd',
+    "year_built": '[data-testid="info-construction-year"] dd',
+    "energy_label": '[data-testid="energy-label"] [data-testid="energy-label-info"]',
+    "area_bra_i": '[data-testid="info-usable-i-area"] dd',
+    "area_bra": '[data-testid="info-usable-area"] dd',
+    "plot_area": '[data-testid="info-plot-area"] dd',
+}
+
+_FACILITIES_SELECTOR = '[data-testid="object-facilities"] li'
+_STATUS_SELECTOR = '[data-testid="object-details"]'
+
+# Reads every field in a single Runtime.evaluate instead of one CDP round-trip per selector.
+_EXTRACT_JS = """
+(() => {
+    const q = s => { const e = document.querySelector(s); return e ? e.textContent.trim() : null; };
+    const qa = s => [...document.querySelectorAll(s)].map(e => e.textContent.trim()).filter(t => t);
+    const out = {};
+    for (const [key, sel] of Object.entries(%s)) out[key] = q(sel);
+    out.facilities = qa(%s);
+    // badge area lives inside object-details; if a line of it reads "Solgt" -> sold.
+    // One innerText read instead of walking every descendant element.
+    const details = document.querySelector(%s);
+    const lines = details ? details.innerText.split("\\n") : [];
+    out.status = lines.some(t => t.trim().toLowerCase() === "solgt") ? "sold" : "active";
+    return out;
+})()
+""" % (json.dumps(_TEXT_SELECTORS), json.dumps(_FACILITIES_SELECTOR), json.dumps(_STATUS_SELECTOR))
+
+
+async def _extract_fields(tab: Tab) -> dict[str, typing.Any]:
+    fields = await tab.evaluate(_EXTRACT_JS, return_by_value=True)
+    if not isinstance(fields, dict):
+        # evaluate hands back (remote_object, errors) when nothing usable came back
+        raise ValueError(f"Could not read property page: {fields}")
+    if not fields.get("title"):
+        raise ValueError("Property page has no title, page not loaded?")
+    return fields
 
 
 # -------------------- main parse --------------------
-async def parse_property_page(browser: Browser, meta: RealestateMetadata, neighbourhoods_geojson: dict[str, typing.Any] | None) -> Property:
+async def parse_property_page(tab: Tab, meta: RealestateMetadata, session: aiohttp.ClientSession, geocode_cache: GeocodeCache | None = None) -> Property:
     """
-    Opens meta.url and parses the property page into a Property model.
+    Parses a tab already navigated to meta.url into a Property model; the
+    caller waits for the page to load (see _parse_in_new_tab in scraper).
+    `session` is the shared Geonorge session used to resolve the address,
+    `geocode_cache` optionally short-circuits addresses already looked up.
+    The neighbourhood is left unset; assign it in bulk with NeighbourhoodIndex.assign.
     """
-    tab: Tab = await browser.get(meta.url)
+    fields = await _extract_fields(tab)
 
     # title + area (subtitle)
-    title = await _text(tab, '[data-testid="object-title"] h1')
-    subtitle = await _text(tab, '[data-testid="object-title"] [data-testid="local-area-name"]')
+    title = fields.get("title")
+    subtitle = fields.get("subtitle")
 
     # status
-    status_val = await _status(tab)
+    status_val = fields.get("status")
 
     # address
-    address_line = await _text(tab, '[data-testid="map-link"] [data-testid="object-address"]')
-    line, postal_code, city = _split_address(address_line)
+    line, postal_code, city = _split_address(_clean(fields.get("address_line")))
 
 
     address = Address(line=line, postal_code=postal_code, city=city)
-    await address.resolve_lat_long()
-    if neighbourhoods_geojson:
-        address.find_neighbourhood(neighbourhoods_geojson)
+    await address.resolve_lat_long(session, geocode_cache)
 
     # description
-    description_raw = await _text(tab, '[data-testid="om boligen"] .description-area')
+    description_raw = _clean(fields.get("description_raw"))
 
     # pricing
-    asking_price = _to_int(await _text(tab, '[data-testid="pricing-incicative-price"] .text-28, [data-testid="pricing-incicative-price"] .font-bold'))
-    total_price = _to_int(await _text(tab, '[data-testid="pricing-total-price"] dd'))
-    transaction_costs = _to_int(await _text(tab, '[data-testid="pricing-registration-charge"] dd'))
-    shared_debt = _to_int(await _text(tab, '[data-testid="pricing-joint-debt"] dd'))
-    communal_fees = _to_int(await _text(tab, '[data-testid="pricing-common-monthly-cost"] dd'))
-    shared_equity = _to_int(await _text(tab, '[data-testid="pricing-collective-assets"] dd'))
-    assessed_wealth_value = _to_int(await _text(tab, '[data-testid="pricing-tax-value"] dd'))
+    asking_price = _to_int(fields.get("asking_price"))
+    total_price = _to_int(fields.get("total_price"))
+    transaction_costs = _to_int(fields.get("transaction_costs"))
+    shared_debt = _to_int(fields.get("shared_debt"))
+    communal_fees = _to_int(fields.get("communal_fees"))
+    shared_equity = _to_int(fields.get("shared_equity"))
+    assessed_wealth_value = _to_int(fields.get("assessed_wealth_value"))
 
     # specs
-    property_type = await _text(tab, '[data-testid="info-property-type"] dd')
-    ownership_type = await _text(tab, '[data-testid="info-ownership-type"] dd')
-    bedrooms = _to_int_safe(await _text(tab, '[data-testid="info-bedrooms"] dd'))
-    rooms = _to_int_safe(await _text(tab, '[data-testid="info-rooms"] dd'))
-    floor = _to_int_safe(await _text(tab, '[data-testid="info-floor"] dd'))
-    year_built = _to_int_safe(await _text(tab, '[data-testid="info-construction-year"] dd'))
-    energy_label = await _text(tab, '[data-testid="energy-label"] [data-testid="energy-label-info"]')
-
-    area_bra_i = _to_float_m2(await _text(tab, '[data-testid="info-usable-i-area"] dd'))
-    area_bra = _to_float_m2(await _text(tab, '[data-testid="info-usable-area"] dd'))
-    plot_area = _to_float_m2(await _text(tab, '[data-testid="info-plot-area"] dd'))
+    property_type = fields.get("property_type")
+    ownership_type = fields.get("ownership_type")
+    bedrooms = _to_int_safe(fields.get("bedrooms"))
+    rooms = _to_int_safe(fields.get("rooms"))
+    floor = _to_int_safe(fields.get("floor"))
+    year_built = _to_int_safe(fields.get("year_built"))
+    energy_label = fields.get("energy_label")
+
+    area_bra_i = _to_float_m2(fields.get("area_bra_i"))
+    area_bra = _to_float_m2(fields.get("area_bra"))
+    plot_area = _to_float_m2(fields.get("plot_area"))
 
     # facilities
-    facilities = await _all_texts(tab, '[data-testid="object-facilities"]') or None
+    facilities = [t for t in map(_clean, fields.get("facilities") or []) if t] or None
 
-    # build Property
-    prop = Property(
+    # build Property; every field is already cleaned/coerced above, so skip validation
+    prop = Property.model_construct(
         title=_clean(title),
         subtitle=_clean(subtitle),
         description_raw=description_raw,
-        category=_clean(meta.category),
+        category=_intern(_clean(meta.category)),
         address=address,
         asking_price=asking_price,
         total_price=total_price,
@@ -175,19 +193,19 @@ async def parse_property_page(browser: Browser, meta: RealestateMetadata, neighb
         assessed_wealth_value=assessed_wealth_value,
         shared_debt=shared_debt,
         shared_equity=shared_equity,
-        property_type=_clean(property_type),
-        ownership_type=_clean(ownership_type),
+        property_type=_intern(_clean(property_type)),
+        ownership_type=_intern(_clean(ownership_type)),
         bedrooms=bedrooms,
         rooms=rooms,
         floor=floor,
         year_built=year_built,
-        energy_label=_clean(energy_label),
+        energy_label=_intern(_clean(energy_label)),
         area_bra_i=area_bra_i,
         area_bra=area_bra,
         plot_area=plot_area,
         facilities=facilities,
         finn_code=_clean(meta.finn_id),
         url=_clean(meta.url),
-        status=status_val,
+        status=_intern(status_val),
     )
     return prop
\ No newline at end of file
@@ -2,15 +2,145 @@
 
 from __future__ import annotations
 
-from datetime import datetime
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from typing import Any, Awaitable, Callable, Iterable
+
 from pydantic import BaseModel, Field
 import aiohttp
 from urllib.parse import quote
 
-from shapely import Point
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry.base import BaseGeometry
 from shapely.geometry.geo import shape
 
 
+def geonorge_session() -> aiohttp.ClientSession:
+    """Create a pooled keep-alive session for Geonorge lookups, shared across a scrape."""
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=32, ttl_dns_cache=300))
+
+
+class GeocodeCache:
+    """
+    In-process cache of Geonorge lookups keyed by normalized search string,
+    optionally persisted to a JSON file between runs. Concurrent lookups of
+    the same address share a single in-flight request.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._results: dict[str, tuple[float, float] | None] = {}
+        self._pending: dict[str, asyncio.Future[tuple[float, float] | None]] = {}
+
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._results = {k: tuple(v) if v else None for k, v in json.load(f).items()}
+
+    @staticmethod
+    def _key(search_string: str) -> str:
+        return " ".join(search_string.lower().split())
+
+    async def lookup(self, search_string: str, fetch: Callable[[], Awaitable[tuple[float, float] | None]]) -> tuple[float, float] | None:
+        """Return the cached result for `search_string`, calling `fetch` on a miss. Failed fetches are not cached."""
+        key = self._key(search_string)
+        if key in self._results:
+            return self._results[key]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            # shield so a cancelled waiter doesn't cancel the request other callers share
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            result = await fetch()
+        except BaseException as e:
+            if not future.done():
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                    future.exception()  # mark retrieved in case nobody else is waiting
+                else:
+                    future.cancel()
+            raise
+        else:
+            self._results[key] = result
+            if not future.done():
+                future.set_result(result)
+            return result
+        finally:
+            del self._pending[key]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._results, f)
+
+
+async def _geocode(session: aiohttp.ClientSession, search_string: str) -> tuple[float, float] | None:
+    """Look up `search_string` with Geonorge. Returns None if it has no match; raises on request failure."""
+    url = f"https://ws.geonorge.no/adresser/v1/sok?sok={quote(search_string)}"
+    async with session.get(url) as response:
+        response.raise_for_status()
+        data = await response.json()
+
+    if data.get("adresser") and len(data["adresser"]) > 0:
+        rep_punkt = data["adresser"][0].get("representasjonspunkt")
+        if rep_punkt and rep_punkt.get("lat") is not None and rep_punkt.get("lon") is not None:
+            return rep_punkt.get("lat"), rep_punkt.get("lon")
+    return None
+
+
+@dataclass
+class NeighbourhoodIndex:
+    """Neighbourhood polygons parsed once and indexed in an STRtree for point lookups."""
+
+    tree: STRtree
+    geoms: list[BaseGeometry]
+    names: list[str | None]
+
+    @classmethod
+    def from_geojson(cls, geojson_data: dict[str, Any]) -> NeighbourhoodIndex:
+        geoms: list[BaseGeometry] = []
+        names: list[str | None] = []
+        for feature in geojson_data.get("features", []):
+            try:
+                geom = shape(feature["geometry"])
+                name = feature["properties"].get("neighbourhood")
+            except Exception:
+                continue
+            geoms.append(geom)
+            names.append(name)
+        return cls(tree=STRtree(geoms), geoms=geoms, names=names)
+
+    def assign(self, addresses: Iterable[Address]) -> None:
+        """
+        Set `neighbourhood` on every address with resolved coordinates using a
+        single vectorized tree query.
+        """
+        resolved = [a for a in addresses if a.lat and a.lon]
+        if not resolved:
+            return
+
+        lonlat = np.array([(a.lon, a.lat) for a in resolved], dtype=np.float64)
+        points = shapely.points(lonlat[:, 0], lonlat[:, 1])
+        input_idx, tree_idx = self.tree.query(points, predicate="within")
+
+        # overlapping polygons: keep the last matching feature in file order, like the original linear scan
+        matches: dict[int, int] = {}
+        for i, t in zip(input_idx.tolist(), tree_idx.tolist()):
+            matches[i] = max(t, matches.get(i, t))
+
+        for i, t in matches.items():
+            resolved[i].neighbourhood = self.names[t]
+
+
 class Address(BaseModel):
     line: str | None 
     """Adresselinje (f.eks. 'Jerikoveien 91B')"""
@@ -30,8 +160,14 @@ class Address(BaseModel):
     neighbourhood: str | None = None
     """Nabolag"""
 
-    async def resolve_lat_long(self) -> tuple[float, float] | None:
-        """Resolve latitude and longitude using Geonorge API."""
+    async def resolve_lat_long(self, session: aiohttp.ClientSession, cache: GeocodeCache | None = None) -> tuple[float, float] | None:
+        """
+        Resolve latitude and longitude using Geonorge API.
+
+        Args:
+            session: Shared session (see geonorge_session) so connections are reused between lookups
+            cache: Optional cache so repeated addresses skip the request
+        """
 
         search_parts = []
         if self.line:
@@ -45,53 +181,37 @@ class Address(BaseModel):
             return None
 
         search_string = " ".join(search_parts)
-        encoded_search = quote(search_string)
-        url = f"https://ws.geonorge.no/adresser/v1/sok?sok={encoded_search}"
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("adresser") and len(data["adresser"]) > 0:
-                            rep_punkt = data["adresser"][0].get("representasjonspunkt")
-                            print(f"Resolved lat/lon for '{search_string}': {rep_punkt.get("lat")}, {rep_punkt.get("lon")}")
-                            if rep_punkt and rep_punkt.get("lat") is not None and rep_punkt.get("lon") is not None:
-                                self.lat = rep_punkt.get("lat")
-                                self.lon = rep_punkt.get("lon")
-                                return self.lat, self.lon
-                    return None
+            if cache is None:
+                coords = await _geocode(session, search_string)
+            else:
+                coords = await cache.lookup(search_string, lambda: _geocode(session, search_string))
         except Exception:
             return None
 
-    def find_neighbourhood(self, geojson_data: dict[str, str]) -> str | None:
+        if coords is None:
+            return None
+
+        self.lat, self.lon = coords
+        print(f"Resolved lat/lon for '{search_string}': {self.lat}, {self.lon}")
+        return self.lat, self.lon
+
+    def find_neighbourhood(self, neighbourhoods: NeighbourhoodIndex) -> str | None:
         """
-        Find the neighbourhood for given coordinates using GeoJSON data.
+        Find the neighbourhood for the resolved coordinates. Single-address
+        form of NeighbourhoodIndex.assign.
 
         Args:
-            lat: Latitude (WGS84)
-            lon: Longitude (WGS84)
-            geojson_data: Loaded GeoJSON data as dictionary
+            neighbourhoods: Indexed neighbourhood polygons
 
         Returns:
             Neighbourhood name or None if not found
         """
-        if not self.lat or not self.lon:
-            return None
-
-        point = Point(self.lon, self.lat)  # Note: Point takes (lon, lat) not (lat, lon)
-
-        for feature in geojson_data.get("features", []):
-            try:
-                polygon = shape(feature["geometry"])
-                if polygon.contains(point):
-                    neigh = feature["properties"].get("neighbourhood")
-                    print(f"Resolved neighbourhood for lat: {self.lat}, lon {self.lon}: {neigh}")
-                    self.neighbourhood = neigh
-            except Exception:
-                continue
-
-        return None
+        neighbourhoods.assign([self])
+        if self.neighbourhood is not None:
+            print(f"Resolved neighbourhood for lat: {self.lat}, lon {self.lon}: {self.neighbourhood}")
+        return self.neighbourhood
 
 class Property(BaseModel):
     # -----------------------
@@ -187,10 +307,10 @@ class Property(BaseModel):
     status: str | None 
     """Status (active/sold/ended)"""
 
-    scraped_at: datetime | None = Field(default_factory=datetime.utcnow)
+    scraped_at: datetime | None = Field(default_factory=lambda: datetime.now(UTC))
     """Tidspunkt for innhenting"""
 
-    raw_meta: dict | None 
+    raw_meta: dict | None = None
     """Eventuelle ekstra felt som ikke er strukturert"""
 
 
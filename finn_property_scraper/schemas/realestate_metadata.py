@@ -1,13 +1,8 @@
-from pydantic.v1 import BaseModel
+from dataclasses import dataclass
 
 
-class RealestateMetadata(BaseModel):
+@dataclass(frozen=True, slots=True)
+class RealestateMetadata:
     url: str
     category: str
-    finn_id: str
-
-    def __eq__(self, other):
-        return self.finn_id == other.finn_id
-
-    def __hash__(self):
-        return hash(self.finn_id)
\ No newline at end of file
+    finn_id: str
\ No newline at end of file
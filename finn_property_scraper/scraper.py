@@ -4,16 +4,24 @@ import re
 import traceback
 import typing
 from urllib.parse import urlencode
+import aiohttp
+import orjson
 import zendriver as zd
 from pydantic import BaseModel
 from pydantic.v1.json import pydantic_encoder
 from zendriver.core.tab import Tab
 
-from finn_property_scraper.parsers.csv_exporter import properties_to_csv
+from finn_property_scraper.parsers.csv_exporter import csv_to_parquet, property_csv_writer
 from finn_property_scraper.parsers.property_page_parser import parse_property_page
-from finn_property_scraper.schemas.property import Property, PropertyList
+from finn_property_scraper.schemas.property import Property, GeocodeCache, NeighbourhoodIndex, geonorge_session
 from finn_property_scraper.schemas.realestate_metadata import RealestateMetadata
 
+# Number of property pages loaded concurrently, each in its own tab
+PARSE_CONCURRENCY = 8
+
+# Parsed properties buffered before neighbourhoods are assigned in one batch and written out
+WRITE_BATCH_SIZE = 64
+
 FINN_BASE_URL = "https://www.finn.no/realestate/homes/search.html?filters"
 
 REALESTATE_PATTERN = re.compile(r"^(?:https:\/\/www\.finn\.no)?/realestate/(?P<cat>[a-zA-Z]+)/ad\.html\?finnkode=(?P<finncode>[0-9]+)$")
@@ -48,6 +56,10 @@ async def _find_realestate_meta(tab: Tab) -> list[RealestateMetadata]:
     for element in a_element:
         url = element.attrs["href"]
 
+        # cheap substring check first; most links on the page are navigation/footer
+        if "/realestate/" not in url or "finnkode=" not in url:
+            continue
+
         # try regex match
         match = REALESTATE_PATTERN.match(url)
         if match:
@@ -62,36 +74,73 @@ async def _find_realestate_meta(tab: Tab) -> list[RealestateMetadata]:
     return meta
 
 
-async def _has_more_pages(tab: Tab) -> bool:
-    # current page is given by aria-current='page' a class
-    current_page_element = await tab.select('a[aria-current="page"]')
-    current_page = int(current_page_element.text)
+# current page is given by aria-current='page' a class; returns [current, max] or null without pagination
+_PAGINATION_JS = """
+(() => {
+    const cur = document.querySelector('a[aria-current="page"]');
+    const all = [...document.querySelectorAll('a[aria-label^="Side "]')].map(e => +e.innerText).filter(n => !Number.isNaN(n));
+    if (!cur || !all.length) return null;
+    return [+cur.innerText, Math.max(...all)];
+})()
+"""
 
-    all_page_elements = await tab.select_all('a[aria-label^="Side "]')
-    all_pages = [int(el.text) for el in all_page_elements]
 
-    max_page = max(all_pages)
+async def _has_more_pages(tab: Tab) -> bool:
+    pages = await tab.evaluate(_PAGINATION_JS, return_by_value=True)
+    if not isinstance(pages, list):
+        print("No pagination found")
+        return False
+
+    current_page, max_page = pages
 
     print(f"Current page: {current_page}, max page: {max_page}")
 
     return max_page >= current_page
 
 
-def _load_neighbourhoods(geojson_path) -> dict[str, typing.Any]:
+def _load_neighbourhoods(geojson_path) -> NeighbourhoodIndex:
     with open(geojson_path) as f:
-        return json.load(f)
+        return NeighbourhoodIndex.from_geojson(json.load(f))
+
+
+async def _parse_in_new_tab(browser: zd.Browser, meta: RealestateMetadata, session: aiohttp.ClientSession, geocode_cache: GeocodeCache, sem: asyncio.Semaphore) -> Property | None:
+    async with sem:
+        try:
+            tab = await browser.get(meta.url, new_tab=True)
+            try:
+                # get() can return on another tab's navigation event when several run at once
+                await tab.wait_for_ready_state("complete")
+                return await parse_property_page(tab, meta, session, geocode_cache)
+            finally:
+                await tab.close()
+        except Exception:
+            print(f"Error parsing property {meta}: {traceback.format_exc()}")
+            return None
+
+
+def _write_batch(batch: list[Property], neighbourhoods: NeighbourhoodIndex, write_csv: typing.Callable[[Property], None], jf: typing.BinaryIO) -> None:
+    neighbourhoods.assign(p.address for p in batch if p.address is not None)
+    for parsed in batch:
+        print(f"Parsed property: {parsed}")
+        write_csv(parsed)
+        # orjson serializes the dumped dict (datetimes included) straight to bytes
+        jf.write(orjson.dumps(parsed.model_dump()))
+        jf.write(b"\n")
 
 
-async def scrape(filters: dict[str, str], max_pages: int | None = None, geojson_file_name: str = "../neighbourhoods.geojson") -> None:
+async def scrape(filters: dict[str, str], max_pages: int | None = None, geojson_file_name: str = "../neighbourhoods.geojson", geocode_cache_file_name: str = "geocode_cache.json") -> None:
     browser = await zd.start(sandbox=True, browser_executable_path="/Applications/Google Chrome.app/Contents/MacOS/Google Chrome", headless=True)
 
 
     page = 1
-    property_meta: list[RealestateMetadata] = []
+    # keyed by finn_id so duplicates across pages are dropped as we go, keeping first-seen order
+    property_meta: dict[str, RealestateMetadata] = {}
 
     neighbourhoods = _load_neighbourhoods(geojson_file_name)
     print(f"Loaded geojson for neighbourhoods: {geojson_file_name}")
 
+    geocode_cache = GeocodeCache(geocode_cache_file_name)
+
 
     try:
         while True:
@@ -106,7 +155,8 @@ async def scrape(filters: dict[str, str], max_pages: int | None = None, geojson_
             meta_for_page = await _find_realestate_meta(tab)
 
             print(f"Found mega in page {page}: {meta_for_page}")
-            property_meta.extend(meta_for_page)
+            for meta in meta_for_page:
+                property_meta.setdefault(meta.finn_id, meta)
 
             if not await _has_more_pages(tab):
                 break
@@ -119,28 +169,33 @@ async def scrape(filters: dict[str, str], max_pages: int | None = None, geojson_
         print(f"Stopping here...")
 
 
-    # TODO - clean up duplicates
-    print(f"Before filtering, have {len(property_meta)} items")
-    properties = list(set(property_meta))
-    print(f"After filtering, have {len(properties)} items")
-
-    parsed_properties: list[Property] = []
+    properties = list(property_meta.values())
+    print(f"Found {len(properties)} unique items")
 
-    for property in properties:
-        try:
-            parsed = await parse_property_page(tab, property, neighbourhoods)
-            print(f"Parsed property: {parsed}")
-            parsed_properties.append(parsed)
-        except Exception:
-            print(f"Error parsing property {property}: {traceback.format_exc()}")
-
-    properties_to_csv(parsed_properties, "output.csv")
-    # json dump properties
-
-    as_list = PropertyList(properties=parsed_properties)
-    as_json = as_list.model_dump_json()
-    with open("../output.json", "w") as f:
-        f.write(as_json)
+    # Stream properties to disk in small batches as they are parsed instead of collecting them all
+    parsed_count = 0
+    sem = asyncio.Semaphore(PARSE_CONCURRENCY)
+    try:
+        with property_csv_writer("output.csv") as write_csv, open("../output.jsonl", "wb", buffering=1 << 20) as jf:
+            async with geonorge_session() as session:
+                tasks = [_parse_in_new_tab(browser, property, session, geocode_cache, sem) for property in properties]
+                batch: list[Property] = []
+                for next_parsed in asyncio.as_completed(tasks):
+                    parsed = await next_parsed
+                    if parsed is None:
+                        continue
+                    batch.append(parsed)
+                    parsed_count += 1
+                    if len(batch) >= WRITE_BATCH_SIZE:
+                        _write_batch(batch, neighbourhoods, write_csv, jf)
+                        batch = []
+                _write_batch(batch, neighbourhoods, write_csv, jf)
+    finally:
+        # keep this run's lookups even if parsing or writing failed part-way
+        geocode_cache.save()
+
+    print(f"Parsed {parsed_count} of {len(properties)} properties")
+    csv_to_parquet("output.csv", "output.parquet")
 
 def main():
     asyncio.run(scrape({"location": "0.20061"}))